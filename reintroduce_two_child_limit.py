@@ -20,21 +20,193 @@ Usage:
     python scripts/reintroduce_two_child_limit.py
 """
 
+import copy
+import inspect
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import h5py
 import numpy as np
 import pandas as pd
-from microdf import MicroSeries
 from policyengine_uk import Microsimulation
 
+try:
+    import numba
+except ImportError:
+    # numba is optional - pure-numpy fallbacks are used when it's absent.
+    numba = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    # pyarrow is optional - CSVs fall back to pandas' own writer.
+    pa = None
+
 # Years to analyse - 2029 and 2030 represent fiscal years 2029-30 and 2030-31
 YEARS = [2029, 2030]
 
+# Fiscal-year labels, e.g. 2029 -> "2029-30", formatted once rather than
+# inside every result-row loop.
+FISCAL_YEARS = {year: f"{year}-{str(year + 1)[-2:]}" for year in YEARS}
+
 # Output directory – write straight into the dashboard's public/data folder
 # so that running this script is all that's needed to refresh the dashboard.
 OUTPUT_DIR = Path(__file__).resolve().parent / "public" / "data"
 
+# Constituency-level inputs. Optional: when either is missing the
+# constituency analysis is skipped up front, before any per-year work.
+CONSTITUENCY_WEIGHTS_PATH = Path("data/parliamentary_constituency_weights.h5")
+CONSTITUENCIES_PATH = Path("data_inputs/constituencies_2024.csv")
+
+
+def has_constituency_inputs():
+    """Whether both constituency input files are present."""
+    return (
+        CONSTITUENCY_WEIGHTS_PATH.exists() and CONSTITUENCIES_PATH.exists()
+    )
+
+
+class SimCache:
+    """Memoised store of simulation results shared by the analysis functions.
+
+    ``Microsimulation.calculate`` re-runs the variable's formula graph on
+    every call, so asking for the same (variable, year) from several
+    analysis functions repeats the dominant cost of the script. Results
+    are stored keyed by (simulation, variable, year, map_to), along with
+    the derived per-year income-change series.
+    """
+
+    def __init__(self, baseline, reform):
+        self.baseline = baseline
+        self.reform = reform
+        self._store = {}
+
+    def get(self, sim, variable, year, map_to):
+        """Memoised sim.calculate(variable, period=year, map_to=map_to)."""
+        key = (id(sim), variable, year, map_to)
+        if key not in self._store:
+            if map_to is None:
+                self._store[key] = sim.calculate(variable, period=year)
+            else:
+                self._store[key] = sim.calculate(
+                    variable, period=year, map_to=map_to
+                )
+        return self._store[key]
+
+    def income_change(self, year):
+        """Household net income change (reform - baseline) for a year.
+
+        MicroSeries subtraction preserves weights, so the result can be
+        reused by every function that needs the per-household change.
+        """
+        key = ("income_change", year)
+        if key not in self._store:
+            baseline_income = self.get(
+                self.baseline, "household_net_income", year, "household"
+            )
+            reform_income = self.get(
+                self.reform, "household_net_income", year, "household"
+            )
+            self._store[key] = reform_income - baseline_income
+        return self._store[key]
+
+    def warm(self):
+        """Precompute the hot sim.calculate() results for both simulations.
+
+        The baseline and reform formula graphs are independent, and
+        policyengine formulas spend most of their time in numpy (which
+        releases the GIL), so the two simulations can be evaluated on
+        separate threads. Each simulation gets its own worker - a single
+        Simulation's internal holder caches are not thread-safe.
+        """
+        print("Precomputing simulation variables...")
+
+        poverty_vars = [
+            "in_poverty_bhc",
+            "in_poverty_ahc",
+            "in_relative_poverty_bhc",
+            "in_relative_poverty_ahc",
+        ]
+        # (variable, map_to, years) triples each simulation actually
+        # needs downstream. Household composition (age, num_children)
+        # comes from a single FRS snapshot - policyengine-uk does not
+        # age people across projection years - so those variables are
+        # only evaluated for the first year and their values shared.
+        all_years = tuple(YEARS)
+        first_year = (YEARS[0],)
+        tasks = {
+            id(self.baseline): [
+                ("gov_balance", None, all_years),
+                ("household_net_income", "household", all_years),
+                ("household_count_people", "household", all_years),
+                ("num_children", "household", first_year),
+                ("household_income_decile", "household", all_years),
+                ("equiv_household_net_income", "household", all_years),
+                ("age", "person", first_year),
+            ] + [(var, "person", all_years) for var in poverty_vars],
+            id(self.reform): [
+                ("gov_balance", None, all_years),
+                ("household_net_income", "household", all_years),
+                ("equiv_household_net_income", "household", all_years),
+            ] + [(var, "person", all_years) for var in poverty_vars],
+        }
+
+        def warm_sim(sim):
+            for variable, map_to, years in tasks[id(sim)]:
+                for year in years:
+                    self.get(sim, variable, year, map_to)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [
+                pool.submit(warm_sim, sim)
+                for sim in (self.baseline, self.reform)
+            ]
+            for future in futures:
+                future.result()
+
+        for year in YEARS:
+            self.income_change(year)
+
+
+def map_years(per_year):
+    """Run a per-year analysis function for every year in YEARS.
+
+    The two years are independent, and once the cache is warm the
+    per-year work is numpy-bound (which releases the GIL), so a thread
+    per year gives real concurrency. Simulations cannot be pickled into
+    worker processes, so threads are the right tool here. Results come
+    back in YEARS order.
+    """
+    with ThreadPoolExecutor(max_workers=len(YEARS)) as pool:
+        futures = [pool.submit(per_year, year) for year in YEARS]
+        return [future.result() for future in futures]
+
+
+def build_demographics(baseline, cache):
+    """Demographic arrays shared across analysis functions.
+
+    ``is_child`` masks people under 18; ``num_children`` counts children
+    per household and ``extra_children`` those beyond the 2nd (the ones
+    who directly lose benefit entitlement under the cap). Household
+    composition comes from a single FRS snapshot - policyengine-uk does
+    not age people across projection years - so the arrays are computed
+    for the first analysis year and shared by every year. Weights, which
+    do vary by year, are never read from these.
+    """
+    first_year = YEARS[0]
+    num_children = cache.get(
+        baseline, "num_children", first_year, "household"
+    ).values
+    shared = {
+        "is_child": cache.get(
+            baseline, "age", first_year, "person"
+        ).values < 18,
+        "num_children": num_children,
+        "extra_children": np.maximum(0, num_children - 2),
+    }
+    return {year: shared for year in YEARS}
+
 
 def create_simulations():
     """Create baseline (current law) and reform (reintroduce cap) simulations.
@@ -44,120 +216,252 @@ def create_simulations():
     """
     print("Creating simulations...")
 
-    # Baseline: current law (no two-child limit from April 2026)
-    baseline = Microsimulation()
-
     # Reform: reintroduce two-child limit from 2029
     # Also turn off the Scottish Two Child Limit Payment, since the Scottish
     # Government said it "is no longer needed" after the UK-wide abolition.
     # If the two-child limit is reintroduced, we assume the TCLP stays off.
-    reform = Microsimulation(
-        reform={
-            "gov.dwp.universal_credit.elements.child.limit.child_count": {
-                "2029-01-01": 2,
-                "2030-01-01": 2,
-            },
-            "gov.dwp.tax_credits.child_tax_credit.limit.child_count": {
-                "2029-01-01": 2,
-                "2030-01-01": 2,
-            },
-            "gov.social_security_scotland.two_child_limit_payment.in_effect": {
-                "2029-01-01": False,
-                "2030-01-01": False,
-            },
-        }
+    reform_parameters = {
+        "gov.dwp.universal_credit.elements.child.limit.child_count": {
+            "2029-01-01": 2,
+            "2030-01-01": 2,
+        },
+        "gov.dwp.tax_credits.child_tax_credit.limit.child_count": {
+            "2029-01-01": 2,
+            "2030-01-01": 2,
+        },
+        "gov.social_security_scotland.two_child_limit_payment.in_effect": {
+            "2029-01-01": False,
+            "2030-01-01": False,
+        },
+    }
+
+    # Baseline: current law (no two-child limit from April 2026, the
+    # policyengine-uk default).
+    baseline = Microsimulation()
+
+    # Parameter uprating dominates Microsimulation construction and the
+    # baseline has already paid for it, so on policyengine-uk versions
+    # whose constructor accepts a prebuilt system, hand the reform a
+    # deep copy of the uprated one rather than rebuilding the parameter
+    # tree from YAML. Check the signature first - the deepcopy itself
+    # is expensive, so it must not be paid speculatively on versions
+    # that would just raise TypeError and throw the copy away.
+    reform = None
+    accepts_system = (
+        "tax_benefit_system"
+        in inspect.signature(Microsimulation.__init__).parameters
     )
+    if accepts_system:
+        candidate = Microsimulation(
+            reform=reform_parameters,
+            tax_benefit_system=copy.deepcopy(baseline.tax_benefit_system),
+        )
+        # Only accept the shortcut if the reform really was applied on
+        # top of the copied system.
+        child_limit = (
+            candidate.tax_benefit_system.parameters.gov.dwp.universal_credit
+            .elements.child.limit.child_count("2029-01-01")
+        )
+        if child_limit == 2:
+            reform = candidate
+    if reform is None:
+        reform = Microsimulation(reform=reform_parameters)
 
     return baseline, reform
 
 
-def calculate_budgetary_impact(baseline, reform):
+def calculate_budgetary_impact(baseline, reform, cache):
     """Calculate budgetary impact (change in government balance)."""
     print("\nCalculating budgetary impact...")
-    results = []
+    # Column-wise accumulation: pd.DataFrame(dict of lists) skips the
+    # per-row type inference that a list of dicts pays for.
+    results = {"year": [], "budgetary_impact_bn": []}
 
+    # gov_balance is pre-warmed by SimCache.warm() alongside the other
+    # variables (one thread per simulation), so this loop only reads
+    # cached series and prints in year order.
     for year in YEARS:
-        baseline_balance = baseline.calculate("gov_balance", year).sum()
-        reform_balance = reform.calculate("gov_balance", year).sum()
+        baseline_balance = cache.get(
+            baseline, "gov_balance", year, None
+        ).sum()
+        reform_balance = cache.get(
+            reform, "gov_balance", year, None
+        ).sum()
         impact_bn = (reform_balance - baseline_balance) / 1e9
 
-        results.append({
-            "year": f"{year}-{str(year + 1)[-2:]}",
-            "budgetary_impact_bn": round(impact_bn, 2),
-        })
-        print(f"  {year}-{str(year + 1)[-2:]}: £{impact_bn:+.2f}bn")
+        results["year"].append(FISCAL_YEARS[year])
+        results["budgetary_impact_bn"].append(round(impact_bn, 2))
+        print(f"  {FISCAL_YEARS[year]}: £{impact_bn:+.2f}bn")
 
     return pd.DataFrame(results)
 
 
-def calculate_headcounts(baseline, reform):
+if numba is not None:
+
+    @numba.njit(cache=True, parallel=True, fastmath=True)
+    def _headcount_kernel(income_change, weights, hh_count_people, num_children):
+        """Fused single pass accumulating every weighted headcount total.
+
+        The separate masked reductions in calculate_headcounts each
+        stream the full household arrays; this retires all seven
+        accumulators in one pass, testing the 'affected' condition once
+        per household. prange splits the pass across cores, with numba
+        reducing the per-thread partial sums.
+        """
+        total_households = 0.0
+        affected_households = 0.0
+        total_people = 0.0
+        affected_people = 0.0
+        total_children = 0.0
+        affected_children = 0.0
+        loss_sum = 0.0
+
+        for i in numba.prange(income_change.shape[0]):
+            w = weights[i]
+            change = income_change[i]
+            extra = num_children[i] - 2.0
+            if extra < 0.0:
+                extra = 0.0
+
+            total_households += w
+            total_people += w * hh_count_people[i]
+            total_children += w * num_children[i]
+
+            if abs(change) > 1.0:
+                affected_households += w
+                affected_people += w * hh_count_people[i]
+                affected_children += w * extra
+                loss_sum += w * change
+
+        return (
+            total_households,
+            affected_households,
+            total_people,
+            affected_people,
+            total_children,
+            affected_children,
+            loss_sum,
+        )
+
+
+def calculate_headcounts(baseline, reform, cache, demographics):
     """Calculate headcounts: households and people affected, total population.
 
     A household is 'affected' if its net income changes by more than £1/year.
     """
     print("\nCalculating headcounts...")
-    results = []
+    results = {
+        "year": [],
+        "total_households": [],
+        "affected_households": [],
+        "total_people": [],
+        "affected_people": [],
+        "total_children": [],
+        "affected_children": [],
+        "pct_households_affected": [],
+        "pct_people_affected": [],
+        "pct_children_affected": [],
+        "avg_loss_per_affected_hh": [],
+    }
+
+    # Reusable buffers for the numpy fallback path's affected mask,
+    # allocated on first use and written in place each year. Sharing
+    # them across years is why this loop stays serial rather than going
+    # through map_years.
+    abs_change = None
+    affected = None
 
     for year in YEARS:
-        fiscal_year = f"{year}-{str(year + 1)[-2:]}"
+        fiscal_year = FISCAL_YEARS[year]
 
-        # sim.calculate() returns MicroSeries with weights - no manual weight handling
-        baseline_income = baseline.calculate(
-            "household_net_income", period=year, map_to="household"
-        )
-        reform_income = reform.calculate(
-            "household_net_income", period=year, map_to="household"
+        hh_count_people = cache.get(
+            baseline, "household_count_people", year, "household"
         )
-        hh_count_people = baseline.calculate(
-            "household_count_people", period=year, map_to="household"
-        )
-
-        # MicroSeries subtraction preserves weights
-        income_change = reform_income - baseline_income
-        affected = np.abs(np.array(income_change)) > 1  # more than £1/yr
-
-        total_households = income_change.count()
-        affected_households = income_change[affected].count()
+        num_children_vals = demographics[year]["num_children"]
+
+        # MicroSeries subtraction preserves weights. Unpack the buffers
+        # once - every .values access below would otherwise go through
+        # the pandas attribute machinery again.
+        income_change = cache.income_change(year)
+        change_vals = income_change.values
+        weights = income_change.weights.values
+
+        if numba is not None:
+            # Single fused pass over the household arrays. float32
+            # inputs halve the memory traffic of this bandwidth-bound
+            # pass (weights and incomes have few significant digits);
+            # the kernel's accumulators are float64 scalars, so the
+            # totals keep double precision.
+            (
+                total_households,
+                affected_households,
+                total_people,
+                affected_people,
+                total_children,
+                affected_children,
+                loss_sum,
+            ) = _headcount_kernel(
+                np.ascontiguousarray(change_vals, dtype=np.float32),
+                np.ascontiguousarray(weights, dtype=np.float32),
+                np.ascontiguousarray(hh_count_people.values, dtype=np.float32),
+                np.ascontiguousarray(num_children_vals, dtype=np.float32),
+            )
+            avg_loss_per_affected_hh = (
+                loss_sum / affected_households
+                if affected_households > 0
+                else 0
+            )
+        else:
+            if abs_change is None:
+                abs_change = np.empty(len(change_vals), dtype=np.float64)
+                affected = np.empty(len(change_vals), dtype=bool)
+            np.abs(change_vals, out=abs_change)
+            np.greater(abs_change, 1.0, out=affected)  # more than £1/yr
+
+            total_households = income_change.count()
+            affected_households = income_change[affected].count()
+
+            total_people = hh_count_people.sum()
+            affected_people = hh_count_people[affected].sum()
+
+            # Weighted with this year's household weights - the shared
+            # num_children array carries values only.
+            total_children = float(np.dot(num_children_vals, weights))
+
+            # Only count children beyond the 2nd in affected households.
+            # A direct weighted dot product - no need to wrap the array
+            # in a MicroSeries just to take one masked sum.
+            extra_children = demographics[year]["extra_children"]
+            affected_children = float(
+                np.dot(extra_children[affected], weights[affected])
+            )
 
-        total_people = hh_count_people.sum()
-        affected_people = hh_count_people[affected].sum()
+            # Average loss per affected household
+            avg_loss_per_affected_hh = (
+                income_change[affected].mean() if affected.sum() > 0 else 0
+            )
 
-        # Children in affected households
-        num_children = baseline.calculate(
-            "num_children", period=year, map_to="household"
+        results["year"].append(fiscal_year)
+        results["total_households"].append(round(total_households))
+        results["affected_households"].append(round(affected_households))
+        results["total_people"].append(round(total_people))
+        results["affected_people"].append(round(affected_people))
+        results["total_children"].append(round(total_children))
+        results["affected_children"].append(round(affected_children))
+        results["pct_households_affected"].append(
+            round(affected_households / total_households * 100, 1)
         )
-        total_children = num_children.sum()
-
-        # Only count children beyond the 2nd in affected households
-        # (the ones who directly lose benefit entitlement)
-        extra_children = np.maximum(0, np.array(num_children) - 2)
-        extra_ms = MicroSeries(extra_children, weights=income_change.weights.values)
-        affected_children = extra_ms[affected].sum()
-
-        # Average loss per affected household
-        avg_loss_per_affected_hh = (
-            income_change[affected].mean() if affected.sum() > 0 else 0
+        results["pct_people_affected"].append(
+            round(affected_people / total_people * 100, 1)
+        )
+        results["pct_children_affected"].append(
+            round(affected_children / total_children * 100, 1)
+            if total_children > 0
+            else 0
+        )
+        results["avg_loss_per_affected_hh"].append(
+            round(avg_loss_per_affected_hh, 2)
         )
-
-        results.append({
-            "year": fiscal_year,
-            "total_households": round(total_households),
-            "affected_households": round(affected_households),
-            "total_people": round(total_people),
-            "affected_people": round(affected_people),
-            "total_children": round(total_children),
-            "affected_children": round(affected_children),
-            "pct_households_affected": round(
-                affected_households / total_households * 100, 1
-            ),
-            "pct_people_affected": round(
-                affected_people / total_people * 100, 1
-            ),
-            "pct_children_affected": round(
-                affected_children / total_children * 100, 1
-            ) if total_children > 0 else 0,
-            "avg_loss_per_affected_hh": round(avg_loss_per_affected_hh, 2),
-        })
 
         print(f"  {fiscal_year}:")
         print(f"    Total population: {total_people:,.0f}")
@@ -171,50 +475,79 @@ def calculate_headcounts(baseline, reform):
     return pd.DataFrame(results)
 
 
-def calculate_distributional_impact(baseline, reform):
+def calculate_distributional_impact(baseline, reform, cache):
     """Calculate distributional impact by income decile."""
     print("\nCalculating distributional impact...")
-    results = []
 
-    for year in YEARS:
+    def year_frame(year):
         # sim.calculate() returns MicroSeries with weights
-        baseline_income = baseline.calculate(
-            "household_net_income", period=year, map_to="household"
-        )
-        reform_income = reform.calculate(
-            "household_net_income", period=year, map_to="household"
+        baseline_income = cache.get(
+            baseline, "household_net_income", year, "household"
         )
-        income_decile = baseline.calculate(
-            "household_income_decile", period=year, map_to="household"
+        income_decile = cache.get(
+            baseline, "household_income_decile", year, "household"
         )
 
         # MicroSeries subtraction preserves weights, .mean()/.sum() are weighted
-        change = reform_income - baseline_income
-
-        for d in range(1, 11):
-            decile_mask = np.array(income_decile) == d
-            if not decile_mask.any():
-                continue
-
-            avg_change = change[decile_mask].mean()
-            avg_baseline = baseline_income[decile_mask].mean()
-            rel_change = (
-                (avg_change / avg_baseline) * 100
-                if avg_baseline > 0
-                else 0
-            )
+        change = cache.income_change(year)
+
+        # Weighted sums for all 10 deciles in one streaming pass each,
+        # instead of a fresh boolean mask and scan per decile.
+        w = baseline_income.weights.values
+        deciles = income_decile.values.astype(np.intp)
+        change_vals = change.values
+        baseline_vals = baseline_income.values
+
+        # Households with sentinel decile codes below 1 (possible for
+        # negative incomes) would crash bincount's indexing; drop them,
+        # matching the old loop which only looked at deciles 1-10.
+        keep = deciles >= 1
+        if not keep.all():
+            deciles = deciles[keep]
+            w = w[keep]
+            change_vals = change_vals[keep]
+            baseline_vals = baseline_vals[keep]
+
+        # Sort by decile once, then each group sum is a contiguous
+        # segment reduction over the sorted arrays - cache-friendly
+        # streaming reads instead of bincount's scattered accumulation,
+        # and the plain weight totals need no scaled intermediate.
+        order = np.argsort(deciles, kind="stable")
+        d_sorted = deciles[order]
+        w_sorted = w[order]
+        bounds = np.searchsorted(d_sorted, np.arange(1, 12))
+
+        def decile_sums(values):
+            # Segment sums as cumulative-sum differences over the
+            # sorted values. reduceat can't represent an empty segment
+            # (it rejects a start index of len(a) and otherwise folds
+            # in a stray element); the prepended-zero cumsum gives an
+            # exact 0 for empty deciles and for a fully filtered year.
+            cum = np.concatenate(([0.0], np.cumsum(values)))
+            return cum[bounds[1:]] - cum[bounds[:-1]]
+
+        weight_sums = decile_sums(w_sorted)
+        change_sums = decile_sums(w_sorted * change_vals[order])
+        baseline_sums = decile_sums(w_sorted * baseline_vals[order])
+
+        valid = weight_sums > 0
+        avg_change = change_sums[valid] / weight_sums[valid]
+        avg_baseline = baseline_sums[valid] / weight_sums[valid]
+        rel_change = np.where(
+            avg_baseline > 0, avg_change / avg_baseline * 100, 0.0
+        )
 
-            results.append({
-                "year": f"{year}-{str(year + 1)[-2:]}",
-                "decile": d,
-                "avg_change_gbp": round(avg_change, 2),
-                "relative_change_pct": round(rel_change, 4),
-            })
+        return pd.DataFrame({
+            "year": FISCAL_YEARS[year],
+            "decile": np.arange(1, 11)[valid],
+            "avg_change_gbp": np.round(avg_change, 2),
+            "relative_change_pct": np.round(rel_change, 4),
+        })
 
-    return pd.DataFrame(results)
+    return pd.concat(map_years(year_frame), ignore_index=True)
 
 
-def calculate_poverty_impact(baseline, reform):
+def calculate_poverty_impact(baseline, reform, cache, demographics):
     """Calculate poverty impact by age group and measure.
 
     Measures: Absolute and Relative poverty (BHC and AHC).
@@ -222,171 +555,288 @@ def calculate_poverty_impact(baseline, reform):
     """
     print("\nCalculating poverty impact...")
 
-    def add_poverty_rows(results, fiscal_year, measure_name, baseline_pov, reform_pov, is_child):
-        """Add Children and All rows for a given poverty measure."""
-        for group, mask in [("Children", is_child), ("All", None)]:
-            if mask is not None:
-                baseline_rate = baseline_pov[mask].mean() * 100
-                reform_rate = reform_pov[mask].mean() * 100
-                baseline_count = int(round(baseline_pov[mask].sum()))
-                reform_count = int(round(reform_pov[mask].sum()))
-            else:
-                baseline_rate = baseline_pov.mean() * 100
-                reform_rate = reform_pov.mean() * 100
-                baseline_count = int(round(baseline_pov.sum()))
-                reform_count = int(round(reform_pov.sum()))
-
-            change_pp = reform_rate - baseline_rate
-            change_pct = (
-                (change_pp / baseline_rate) * 100
-                if baseline_rate > 0
-                else 0
-            )
+    # Variable names follow the Scottish MetricsCalculator pattern.
+    measures = [
+        ("Absolute BHC", "in_poverty_bhc"),
+        ("Relative BHC", "in_relative_poverty_bhc"),
+        ("Absolute AHC", "in_poverty_ahc"),
+        ("Relative AHC", "in_relative_poverty_ahc"),
+    ]
+
+    columns = [
+        "year",
+        "measure",
+        "group",
+        "baseline_rate_pct",
+        "reform_rate_pct",
+        "change_pp",
+        "change_pct",
+        "baseline_count",
+        "reform_count",
+    ]
+
+    def year_rows(year):
+        rows = {column: [] for column in columns}
+        fiscal_year = FISCAL_YEARS[year]
+
+        # Person weights vary by year, so take them from a per-year
+        # series (age is only evaluated for the first year now).
+        is_child = demographics[year]["is_child"]
+        weights = cache.get(
+            baseline, "in_poverty_bhc", year, "person"
+        ).weights.values
+
+        # Stack the four poverty flags into (n_people, 4) matrices so
+        # the weighted counts for every measure fall out of one matrix
+        # product per (simulation, group) instead of eight separate
+        # masked means.
+        baseline_mat = np.column_stack([
+            cache.get(baseline, var, year, "person").values
+            for _, var in measures
+        ])
+        reform_mat = np.column_stack([
+            cache.get(reform, var, year, "person").values
+            for _, var in measures
+        ])
+
+        # Child-group reductions fuse the weight x is_child x flag
+        # triple product into a single einsum pass - no boolean gather
+        # of the stacked matrices (which would copy them), no temporary
+        # masks, and no materialised child-weight vector.
+        total_weight = weights.sum()
+        child_weight = np.einsum("i,i->", weights, is_child)
+
+        baseline_counts_all = weights @ baseline_mat
+        reform_counts_all = weights @ reform_mat
+        baseline_counts_child = np.einsum(
+            "i,i,im->m", weights, is_child, baseline_mat
+        )
+        reform_counts_child = np.einsum(
+            "i,i,im->m", weights, is_child, reform_mat
+        )
 
-            results.append({
-                "year": fiscal_year,
-                "measure": measure_name,
-                "group": group,
-                "baseline_rate_pct": round(baseline_rate, 2),
-                "reform_rate_pct": round(reform_rate, 2),
-                "change_pp": round(change_pp, 2),
-                "change_pct": round(change_pct, 1),
-                "baseline_count": baseline_count,
-                "reform_count": reform_count,
-            })
+        group_stats = {
+            "Children": (
+                baseline_counts_child,
+                reform_counts_child,
+                child_weight,
+            ),
+            "All": (baseline_counts_all, reform_counts_all, total_weight),
+        }
 
-    results = []
+        for m, (measure_name, _) in enumerate(measures):
+            for group in ["Children", "All"]:
+                baseline_counts, reform_counts, group_weight = group_stats[
+                    group
+                ]
+                baseline_rate = baseline_counts[m] / group_weight * 100
+                reform_rate = reform_counts[m] / group_weight * 100
+
+                change_pp = reform_rate - baseline_rate
+                change_pct = (
+                    (change_pp / baseline_rate) * 100
+                    if baseline_rate > 0
+                    else 0
+                )
 
-    for year in YEARS:
-        fiscal_year = f"{year}-{str(year + 1)[-2:]}"
+                rows["year"].append(fiscal_year)
+                rows["measure"].append(measure_name)
+                rows["group"].append(group)
+                rows["baseline_rate_pct"].append(round(baseline_rate, 2))
+                rows["reform_rate_pct"].append(round(reform_rate, 2))
+                rows["change_pp"].append(round(change_pp, 2))
+                rows["change_pct"].append(round(change_pct, 1))
+                rows["baseline_count"].append(int(round(baseline_counts[m])))
+                rows["reform_count"].append(int(round(reform_counts[m])))
 
-        # sim.calculate() returns MicroSeries with weights
-        age = baseline.calculate("age", period=year, map_to="person")
-        is_child = np.array(age) < 18
-
-        for housing_cost in ["bhc", "ahc"]:
-            hc_label = housing_cost.upper()
-
-            for poverty_type in ["absolute", "relative"]:
-                # Variable names follow the Scottish MetricsCalculator pattern
-                if poverty_type == "absolute":
-                    poverty_var = f"in_poverty_{housing_cost}"
-                else:
-                    poverty_var = f"in_relative_poverty_{housing_cost}"
-
-                measure_name = f"{poverty_type.title()} {hc_label}"
-                baseline_pov = baseline.calculate(
-                    poverty_var, period=year, map_to="person"
-                )
-                reform_pov = reform.calculate(
-                    poverty_var, period=year, map_to="person"
-                )
-                add_poverty_rows(
-                    results, fiscal_year, measure_name,
-                    baseline_pov, reform_pov, is_child,
-                )
+        return rows
+
+    results = {column: [] for column in columns}
+    for rows in map_years(year_rows):
+        for column in columns:
+            results[column].extend(rows[column])
 
     return pd.DataFrame(results)
 
 
-def calculate_inequality_impact(baseline, reform):
+if numba is not None:
+
+    @numba.njit(cache=True, fastmath=True)
+    def _gini_kernel(x, w):
+        """Single streaming pass over sorted (values, weights).
+
+        The running cumulative sum makes the loop sequential, but it
+        folds the cumsum, the Lorenz integrand and all three totals
+        into one traversal with no temporaries - the numpy path below
+        allocates three full-length intermediates.
+        """
+        cum_xw = 0.0
+        total_w = 0.0
+        lorenz = 0.0
+        for i in range(x.shape[0]):
+            xw = x[i] * w[i]
+            cum_xw += xw
+            total_w += w[i]
+            lorenz += w[i] * (cum_xw - 0.5 * xw)
+        return 1 - 2 * lorenz / (total_w * cum_xw)
+
+
+def weighted_gini(values, weights):
+    """Weighted Gini coefficient via the sorted Lorenz-curve formula.
+
+    One argsort plus two cumulative sums - O(n log n) and much faster
+    than the MicroSeries.gini() wrapper path on hundreds of thousands
+    of households. With numba installed the post-sort reduction runs
+    as a fused single-pass kernel.
+    """
+    order = np.argsort(values)
+    x = values[order]
+    w = weights[order]
+    if numba is not None:
+        return _gini_kernel(
+            np.ascontiguousarray(x, dtype=np.float64),
+            np.ascontiguousarray(w, dtype=np.float64),
+        )
+    cum_xw = np.cumsum(x * w)
+    total_w = w.sum()
+    total_xw = cum_xw[-1]
+    # Trapezoid integration of the Lorenz curve.
+    lorenz_area = np.sum(w * (cum_xw - 0.5 * x * w)) / (total_w * total_xw)
+    return 1 - 2 * lorenz_area
+
+
+def calculate_inequality_impact(baseline, reform, cache):
     """Calculate Gini index change."""
     print("\nCalculating inequality impact...")
-    results = []
-
-    for year in YEARS:
+    results = {
+        "year": [],
+        "baseline_gini": [],
+        "reform_gini": [],
+        "gini_change_pct": [],
+    }
+
+    def year_ginis(year):
         # sim.calculate() returns MicroSeries with weights
-        baseline_equiv = baseline.calculate(
-            "equiv_household_net_income", period=year, map_to="household"
+        baseline_equiv = cache.get(
+            baseline, "equiv_household_net_income", year, "household"
         )
-        reform_equiv = reform.calculate(
-            "equiv_household_net_income", period=year, map_to="household"
+        reform_equiv = cache.get(
+            reform, "equiv_household_net_income", year, "household"
         )
-        hh_count = baseline.calculate(
-            "household_count_people", period=year, map_to="household"
+        hh_count = cache.get(
+            baseline, "household_count_people", year, "household"
         )
 
         # Person-weight the household data for Gini (weight by household size)
-        adjusted_weights = baseline_equiv.weights.values * np.array(hh_count)
-
-        baseline_gini = MicroSeries(
-            np.maximum(np.array(baseline_equiv), 0), weights=adjusted_weights
-        ).gini()
-        reform_gini = MicroSeries(
-            np.maximum(np.array(reform_equiv), 0), weights=adjusted_weights
-        ).gini()
-
+        weights = baseline_equiv.weights.values
+        adjusted_weights = np.empty_like(weights)
+        np.multiply(weights, hh_count.values, out=adjusted_weights)
+
+        # Clamp negative incomes in place into one reusable buffer -
+        # np.maximum(x, 0) would allocate a fresh full-population array
+        # per series. weighted_gini copies on sort, so the buffer can be
+        # reused for the reform series; it stays local to the year
+        # because map_years runs both years concurrently. Matching the
+        # income dtype keeps the buffer half-size when the sim returns
+        # float32.
+        clipped = np.empty_like(baseline_equiv.values)
+        np.clip(baseline_equiv.values, 0, None, out=clipped)
+        baseline_gini = weighted_gini(clipped, adjusted_weights)
+        np.clip(reform_equiv.values, 0, None, out=clipped)
+        reform_gini = weighted_gini(clipped, adjusted_weights)
+
+        return baseline_gini, reform_gini
+
+    for year, (baseline_gini, reform_gini) in zip(
+        YEARS, map_years(year_ginis)
+    ):
         gini_change_pct = (
             (reform_gini - baseline_gini) / baseline_gini
         ) * 100
 
-        fiscal_year = f"{year}-{str(year + 1)[-2:]}"
-        results.append({
-            "year": fiscal_year,
-            "baseline_gini": round(baseline_gini, 6),
-            "reform_gini": round(reform_gini, 6),
-            "gini_change_pct": round(gini_change_pct, 2),
-        })
+        fiscal_year = FISCAL_YEARS[year]
+        results["year"].append(fiscal_year)
+        results["baseline_gini"].append(round(baseline_gini, 6))
+        results["reform_gini"].append(round(reform_gini, 6))
+        results["gini_change_pct"].append(round(gini_change_pct, 2))
         print(f"  {fiscal_year}: Gini change {gini_change_pct:+.2f}%")
 
     return pd.DataFrame(results)
 
 
-def calculate_constituency_impact(baseline, reform):
+def calculate_constituency_impact(baseline, reform, cache):
     """Calculate constituency-level impacts."""
     print("\nCalculating constituency impacts...")
 
-    weights_path = Path("data/parliamentary_constituency_weights.h5")
-    constituencies_path = Path("data_inputs/constituencies_2024.csv")
-
-    if not weights_path.exists() or not constituencies_path.exists():
+    if not has_constituency_inputs():
         print("  Constituency data not found, skipping.")
         return pd.DataFrame()
 
-    with h5py.File(weights_path, "r") as f:
-        constituency_weights = f["2025"][...]
+    # A 64 MB chunk cache lets the HDF5 library stream whole rows of the
+    # weights matrix per read instead of re-fetching chunks.
+    with h5py.File(
+        CONSTITUENCY_WEIGHTS_PATH, "r", rdcc_nbytes=64 << 20
+    ) as f:
+        # Statistical weights comfortably fit float32, which halves the
+        # memory traffic of the bandwidth-bound matrix products below.
+        # read_direct converts inside the HDF5 library, so the stored
+        # float64 matrix is never materialised in full.
+        dataset = f["2025"]
+        constituency_weights = np.empty(dataset.shape, dtype=np.float32)
+        dataset.read_direct(constituency_weights)
+
+    constituency_df = pd.read_csv(CONSTITUENCIES_PATH)
+    # Plain ndarrays, pulled out once - no pandas indexing machinery in
+    # the per-year frame construction.
+    codes = constituency_df["code"].to_numpy()
+    names = constituency_df["name"].to_numpy()
+
+    # Weighted household counts per constituency don't vary by year.
+    counts = constituency_weights.sum(axis=1, dtype=np.float64)
+
+    def year_frame(year):
+        baseline_income = np.asarray(
+            cache.get(
+                baseline, "household_net_income", year, "household"
+            ).values,
+            dtype=np.float32,
+        )
+        # Multiply the weights into the change vector, not into each
+        # income vector separately: differencing two large weighted sums
+        # in float32 would lose the (small) per-constituency change to
+        # cancellation.
+        income_change = np.asarray(
+            cache.income_change(year).values,
+            dtype=np.float32,
+        )
 
-    constituency_df = pd.read_csv(constituencies_path)
+        fiscal_year = FISCAL_YEARS[year]
 
-    results = []
+        # The weights matrix is (n_constituencies, n_households), so each
+        # constituency's weighted income total is one row of a single
+        # matrix-vector product - no per-constituency MicroSeries needed.
+        baseline_sums = (constituency_weights @ baseline_income).astype(
+            np.float64
+        )
+        change_sums = (constituency_weights @ income_change).astype(
+            np.float64
+        )
 
-    for year in YEARS:
-        baseline_income = baseline.calculate(
-            "household_net_income", period=year, map_to="household"
-        ).values
-        reform_income = reform.calculate(
-            "household_net_income", period=year, map_to="household"
-        ).values
-
-        fiscal_year = f"{year}-{str(year + 1)[-2:]}"
-
-        for i in range(len(constituency_df)):
-            name = constituency_df.iloc[i]["name"]
-            code = constituency_df.iloc[i]["code"]
-            weight = constituency_weights[i]
-
-            baseline_ms = MicroSeries(baseline_income, weights=weight)
-            reform_ms = MicroSeries(reform_income, weights=weight)
-
-            avg_change = (
-                reform_ms.sum() - baseline_ms.sum()
-            ) / baseline_ms.count()
-            avg_baseline = baseline_ms.sum() / baseline_ms.count()
-            rel_change = (
-                (avg_change / avg_baseline) * 100
-                if avg_baseline > 0
-                else 0
-            )
+        avg_baseline = baseline_sums / counts
+        avg_change = change_sums / counts
+        rel_change = np.where(
+            avg_baseline > 0, avg_change / avg_baseline * 100, 0.0
+        )
 
-            results.append({
-                "year": fiscal_year,
-                "constituency_code": code,
-                "constituency_name": name,
-                "avg_change_gbp": round(avg_change, 2),
-                "relative_change_pct": round(rel_change, 4),
-            })
+        return pd.DataFrame({
+            "year": fiscal_year,
+            "constituency_code": codes,
+            "constituency_name": names,
+            "avg_change_gbp": np.round(avg_change, 2),
+            "relative_change_pct": np.round(rel_change, 4),
+        })
 
-    return pd.DataFrame(results)
+    return pd.concat(map_years(year_frame), ignore_index=True)
 
 
 def print_summary(
@@ -410,7 +860,7 @@ def print_summary(
         print(headcounts_df.to_string(index=False))
 
     # Use the last year for detailed breakdowns
-    last_year = f"{YEARS[-1]}-{str(YEARS[-1] + 1)[-2:]}"
+    last_year = FISCAL_YEARS[YEARS[-1]]
 
     print(f"\n--- DISTRIBUTIONAL IMPACT ({last_year}) ---")
     year_data = distributional_df[distributional_df["year"] == last_year]
@@ -428,19 +878,38 @@ def print_summary(
         print(inequality_df.to_string(index=False))
 
     if not constituency_df.empty:
+        year_const = constituency_df[constituency_df["year"] == last_year]
+
         print(f"\n--- CONSTITUENCY IMPACT ({last_year}, top 20 hardest hit) ---")
-        year_const = constituency_df[
-            constituency_df["year"] == last_year
-        ].sort_values("avg_change_gbp")
         if not year_const.empty:
-            print(year_const.head(20)[[
+            # Partial selection with argpartition is O(n); only the 20
+            # rows shown at each end need sorting.
+            changes = year_const["avg_change_gbp"].to_numpy()
+            k = min(20, len(changes))
+            hardest_hit = year_const.iloc[
+                np.argpartition(changes, k - 1)[:k]
+            ].sort_values("avg_change_gbp")
+            print(hardest_hit[[
                 "constituency_name", "avg_change_gbp", "relative_change_pct"
             ]].to_string(index=False))
 
         print(f"\n--- CONSTITUENCY IMPACT ({last_year}, 20 least affected) ---")
-        print(year_const.tail(20)[[
-            "constituency_name", "avg_change_gbp", "relative_change_pct"
-        ]].to_string(index=False))
+        if not year_const.empty:
+            least_affected = year_const.iloc[
+                np.argpartition(changes, -k)[-k:]
+            ].sort_values("avg_change_gbp")
+            print(least_affected[[
+                "constituency_name", "avg_change_gbp", "relative_change_pct"
+            ]].to_string(index=False))
+
+
+def write_csv(df, path):
+    """Write a DataFrame to CSV, via pyarrow's multithreaded writer when
+    it's installed (pandas' own writer is single-threaded pure Python)."""
+    if pa is not None:
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+    else:
+        df.to_csv(path, index=False)
 
 
 def main():
@@ -449,7 +918,7 @@ def main():
     print("=" * 70)
     print("\nBaseline: Current law (two-child limit removed, Autumn Budget 2025)")
     print("Reform:   Reintroduce two-child limit (child_count = 2) from 2029")
-    print(f"Years:    {', '.join(f'{y}-{str(y + 1)[-2:]}' for y in YEARS)}")
+    print(f"Years:    {', '.join(FISCAL_YEARS[y] for y in YEARS)}")
     print()
 
     # Create output directory
@@ -458,13 +927,22 @@ def main():
     # Create simulations (shared across all calculations)
     baseline, reform = create_simulations()
 
+    # Shared cache of sim.calculate() results, so each (variable, year)
+    # is computed once across all the analysis functions below. Warm it
+    # with both simulations evaluated concurrently.
+    cache = SimCache(baseline, reform)
+    cache.warm()
+
+    # Demographic arrays shared by the headcount and poverty functions
+    demographics = build_demographics(baseline, cache)
+
     # Run all calculations
-    budgetary_df = calculate_budgetary_impact(baseline, reform)
-    headcounts_df = calculate_headcounts(baseline, reform)
-    distributional_df = calculate_distributional_impact(baseline, reform)
-    poverty_df = calculate_poverty_impact(baseline, reform)
-    inequality_df = calculate_inequality_impact(baseline, reform)
-    constituency_df = calculate_constituency_impact(baseline, reform)
+    budgetary_df = calculate_budgetary_impact(baseline, reform, cache)
+    headcounts_df = calculate_headcounts(baseline, reform, cache, demographics)
+    distributional_df = calculate_distributional_impact(baseline, reform, cache)
+    poverty_df = calculate_poverty_impact(baseline, reform, cache, demographics)
+    inequality_df = calculate_inequality_impact(baseline, reform, cache)
+    constituency_df = calculate_constituency_impact(baseline, reform, cache)
 
     # Print summary
     print_summary(
@@ -476,16 +954,25 @@ def main():
         constituency_df,
     )
 
-    # Save CSVs
-    budgetary_df.to_csv(OUTPUT_DIR / "budgetary.csv", index=False)
-    headcounts_df.to_csv(OUTPUT_DIR / "headcounts.csv", index=False)
-    distributional_df.to_csv(OUTPUT_DIR / "distributional.csv", index=False)
-    poverty_df.to_csv(OUTPUT_DIR / "poverty.csv", index=False)
-    inequality_df.to_csv(OUTPUT_DIR / "inequality.csv", index=False)
+    # Save CSVs - each file is independent, so overlap the text encoding
+    # and disk writes on a small thread pool.
+    outputs = [
+        (budgetary_df, "budgetary.csv"),
+        (headcounts_df, "headcounts.csv"),
+        (distributional_df, "distributional.csv"),
+        (poverty_df, "poverty.csv"),
+        (inequality_df, "inequality.csv"),
+    ]
     if not constituency_df.empty:
-        constituency_df.to_csv(
-            OUTPUT_DIR / "constituency.csv", index=False
-        )
+        outputs.append((constituency_df, "constituency.csv"))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [
+            pool.submit(write_csv, df, OUTPUT_DIR / filename)
+            for df, filename in outputs
+        ]
+        for future in futures:
+            future.result()
 
     print(f"\n{'=' * 70}")
     print(f"Results saved to {OUTPUT_DIR}/")